@@ -2,13 +2,33 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+import os
+import tempfile
 from datetime import datetime
 
 # ===== DATASET CONFIGURATION =====
 # Replace with your actual dataset filename
 DATASET_FILENAME = "GrowEasyAnalytics_1.csv"
+# Columns the dashboard reads (cluster_category is the alternate spelling)
+DATASET_COLUMNS = ['Customer_ID', 'outlet_city', 'luxury_sales', 'fresh_sales',
+                   'dry_sales', 'cluster_catgeory', 'cluster_category',
+                   'cluster_name', 'Total_sales']
+# Low-cardinality labels are stored as categoricals (integer codes) and
+# sales amounts as float32, which is ample precision for LKR values;
+# customer IDs are read as nullable Int64 and narrowed in normalize_dtypes
+DATASET_DTYPES = {'Customer_ID': 'Int64',
+                  'outlet_city': 'category', 'cluster_name': 'category',
+                  'cluster_catgeory': 'category', 'cluster_category': 'category',
+                  'Total_sales': 'float32', 'luxury_sales': 'float32',
+                  'fresh_sales': 'float32', 'dry_sales': 'float32'}
+SALES_COLUMNS = ['Total_sales', 'luxury_sales', 'fresh_sales', 'dry_sales']
+# Rows plotted in the customer scatter (sampled for browser performance)
+SCATTER_SAMPLE_SIZE = 10000
+SCATTER_COLUMNS = ['luxury_sales', 'fresh_sales', 'Total_sales', 'cluster_catgeory',
+                   'Customer_ID', 'outlet_city', 'dry_sales']
 # ===== END DATASET CONFIGURATION =====
 
 # Page configuration
@@ -85,38 +105,306 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 @st.cache_data
-def create_customer_insights_box(df):
+def create_customer_insights_box(city_stats, segment_stats, sales_totals, high_spenders, total_customers):
     """Create customer insights summary"""
     insights = []
     
     # Top spending customer segment
-    top_segment = df.groupby('cluster_catgeory')['Total_sales'].sum().idxmax()
-    top_segment_revenue = df.groupby('cluster_catgeory')['Total_sales'].sum().max()
+    top_segment = segment_stats['Total_sales'].idxmax()
+    top_segment_revenue = segment_stats['Total_sales'].max()
     insights.append(f"**{top_segment}** is our highest revenue segment with LKR {top_segment_revenue:,.0f}")
     
     # Most valuable city
-    top_city = df.groupby('outlet_city')['Total_sales'].sum().idxmax()
-    top_city_customers = df[df['outlet_city'] == top_city]['Customer_ID'].nunique()
+    top_city = city_stats['Total_sales'].idxmax()
+    top_city_customers = city_stats.loc[top_city, 'Customer_ID']
     insights.append(f"**{top_city}** leads with {top_city_customers:,} customers")
     
     # Category leader
-    categories = {'Luxury': df['luxury_sales'].sum(), 
-                 'Fresh': df['fresh_sales'].sum(), 
-                 'Dry Goods': df['dry_sales'].sum()}
+    categories = {'Luxury': sales_totals['luxury_sales'], 
+                 'Fresh': sales_totals['fresh_sales'], 
+                 'Dry Goods': sales_totals['dry_sales']}
     top_category = max(categories, key=categories.get)
     insights.append(f"**{top_category}** dominates sales with LKR {categories[top_category]:,.0f}")
     
     # Customer spending pattern
-    high_spenders = len(df[df['Total_sales'] > df['Total_sales'].quantile(0.9)])
-    total_customers = df['Customer_ID'].nunique()
     insights.append(f"{high_spenders:,} customers ({(high_spenders/total_customers)*100:.1f}%) are premium spenders")
     
     return insights
 
+def normalize_dtypes(df):
+    """Apply DATASET_DTYPES, with label categories in sorted order"""
+    # Parquet reads integer categoricals back as plain ints, and chunked CSV
+    # parsing can leave categories unordered
+    for col, dtype in DATASET_DTYPES.items():
+        if col not in df.columns:
+            continue
+        df[col] = df[col].astype(dtype)
+        if dtype == 'category':
+            df[col] = df[col].cat.reorder_categories(sorted(df[col].cat.categories))
+    
+    # Complete customer IDs move to the smallest plain integer type that
+    # holds their range (int32 for the bundled data); IDs with blanks stay
+    # nullable Int64
+    ids = df.get('Customer_ID')
+    if ids is not None and not ids.hasnans:
+        df['Customer_ID'] = pd.to_numeric(ids.to_numpy(dtype=np.int64), downcast='integer')
+    return df
+
+def fingerprint_dataset(df):
+    """Tag the loaded frame with a hash of its full contents"""
+    # Keys the aggregates cache; unlike Streamlit's own frame hash, which
+    # samples 10k rows of large frames, it covers every row
+    df.attrs['fingerprint'] = int(pd.util.hash_pandas_object(df, index=False).sum())
+    return df
+
+@st.cache_resource(max_entries=2)
+def read_dataset(source):
+    """Parse the dataset once and reuse it across reruns"""
+    # Held as a shared resource: every rerun gets the same read-only frame
+    # instead of unpickling a fresh copy of the full dataset; the cache is
+    # process-wide, so it keeps only the bundled file and one upload
+    # A typed Parquet copy next to the CSV skips text parsing on cold starts
+    parquet_path = None
+    if isinstance(source, str):
+        # Hidden, app-owned name so a user's own <name>.parquet is never replaced
+        directory, filename = os.path.split(source)
+        parquet_path = os.path.join(directory, f".{os.path.splitext(filename)[0]}.cache.parquet")
+        # The copy records the size and mtime of the CSV it was made from;
+        # any other CSV (even an older one) means it is out of date
+        stat = os.stat(source)
+        source_stamp = f"{stat.st_size}:{stat.st_mtime_ns}".encode()
+        try:
+            schema = pq.read_schema(parquet_path)
+        except (OSError, pa.ArrowException):
+            # Missing or unreadable copy: parse the CSV and rewrite it
+            schema = None
+        if schema is not None and (schema.metadata or {}).get(b'source_stamp') == source_stamp:
+            # Column store: read only the columns the dashboard uses
+            columns = [col for col in schema.names if col in DATASET_COLUMNS]
+            df = normalize_dtypes(pd.read_parquet(parquet_path, columns=columns))
+            return fingerprint_dataset(df)
+    
+    # Arrow's multi-threaded CSV reader needs usecols as an explicit list
+    header = pd.read_csv(source, nrows=0).columns
+    if hasattr(source, 'seek'):
+        source.seek(0)
+    usecols = [col for col in header if col in DATASET_COLUMNS]
+    df = pd.read_csv(source, usecols=usecols, dtype=DATASET_DTYPES, engine="pyarrow")
+    
+    # Handle the cluster_category vs cluster_catgeory naming issue
+    if 'cluster_category' in df.columns and 'cluster_catgeory' not in df.columns:
+        df = df.rename(columns={'cluster_category': 'cluster_catgeory'})
+    
+    df = normalize_dtypes(df)
+    
+    if parquet_path is not None:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        table = table.replace_schema_metadata(
+            {**(table.schema.metadata or {}), b'source_stamp': source_stamp})
+        tmp_path = None
+        try:
+            # Write beside the target and swap it in, so an interrupted write
+            # never leaves a truncated copy under the real name
+            fd, tmp_path = tempfile.mkstemp(
+                prefix=f".{os.path.basename(parquet_path)}.", suffix=".parquet",
+                dir=os.path.dirname(parquet_path) or ".")
+            os.close(fd)
+            # mkstemp creates the file owner-only; give the copy the usual
+            # permissions for new files under the current umask
+            umask = os.umask(0)
+            os.umask(umask)
+            os.chmod(tmp_path, 0o666 & ~umask)
+            pq.write_table(table, tmp_path)
+            os.replace(tmp_path, parquet_path)
+        except OSError:
+            # Read-only deployments simply keep parsing the CSV
+            if tmp_path is not None and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    
+    return fingerprint_dataset(df)
+
+def load_uploaded_data(prompt):
+    """Let the user upload the dataset when the bundled file can't be used"""
+    st.subheader(prompt)
+    uploaded_file = st.file_uploader("Choose your CSV file", type="csv")
+    if uploaded_file is None:
+        st.stop()
+    try:
+        return read_dataset(uploaded_file)
+    except Exception as e:
+        st.error(f"Error reading uploaded file: {str(e)}")
+        st.stop()
+
+def load_data():
+    """Load and cache the supermarket dataset"""
+    try:
+        df = read_dataset(DATASET_FILENAME)
+        
+        # Check if the required columns exist
+        expected_columns = ['Customer_ID', 'outlet_city', 'luxury_sales', 'fresh_sales', 
+                          'dry_sales', 'cluster_name', 'Total_sales']
+        
+        if 'cluster_catgeory' not in df.columns:
+            st.error("Column 'cluster_catgeory' or 'cluster_category' not found in dataset!")
+            st.error(f"Available columns: {list(df.columns)}")
+            st.stop()
+        
+        # Verify all required columns exist
+        missing_columns = []
+        for col in expected_columns:
+            if col not in df.columns:
+                missing_columns.append(col)
+        
+        if 'cluster_catgeory' not in df.columns:
+            missing_columns.append('cluster_catgeory')
+            
+        if missing_columns:
+            st.error(f"Missing required columns: {missing_columns}")
+            st.error(f"Available columns in your dataset: {list(df.columns)}")
+            st.stop()
+            
+        return df
+        
+    except FileNotFoundError:
+        st.error(f"Dataset file '{DATASET_FILENAME}' not found!")
+        st.info("Please ensure your CSV file is:")
+        st.info("1. Located in the same directory as this script")
+        st.info("2. Named correctly in the DATASET_FILENAME variable")
+        st.info("3. Uploaded to your deployment platform if using cloud hosting")
+        
+        # Provide file upload option as fallback
+        return load_uploaded_data("Upload your dataset instead:")
+            
+    except Exception as e:
+        st.error(f"Error loading dataset: {str(e)}")
+        st.error("Please check your dataset format and column names")
+        
+        # Show file upload option as fallback
+        return load_uploaded_data("Try uploading your dataset:")
+
+@st.cache_data(persist="disk", max_entries=32)
+def compute_aggregates(_df, dataset_fingerprint, filter_key):
+    """Compute the grouped totals shared by the metrics and charts"""
+    # Keyed on the full-content fingerprint and the filter selection, so
+    # results persisted to disk survive restarts without going stale
+    # Sales are stored as float32; group on float64 copies so that
+    # per-city and per-segment revenue totals stay exact
+    wide = _df.astype(dict.fromkeys(SALES_COLUMNS, 'float64'))
+    
+    # Per-city metrics in a single pass; named aggregation keeps the
+    # columns flat for the city charts and the performance table
+    city_stats = wide.groupby('outlet_city', observed=True).agg(
+        Total_sales=('Total_sales', 'sum'),
+        avg_basket=('Total_sales', 'mean'),
+        transactions=('Total_sales', 'count'),
+        Customer_ID=('Customer_ID', 'nunique'),
+        luxury_sales=('luxury_sales', 'sum'),
+        avg_luxury=('luxury_sales', 'mean'),
+        fresh_sales=('fresh_sales', 'sum'),
+        avg_fresh=('fresh_sales', 'mean'),
+        dry_sales=('dry_sales', 'sum'),
+        avg_dry=('dry_sales', 'mean')
+    )
+    
+    # Per-segment revenue and customer counts
+    segment_stats = wide.groupby('cluster_catgeory', observed=True).agg({
+        'Total_sales': 'sum',
+        'Customer_ID': 'nunique'
+    })
+    
+    # City x segment revenue grid for the heatmap
+    city_segment_revenue = wide.groupby(['outlet_city', 'cluster_catgeory'], observed=True)[
+        'Total_sales'].sum().unstack(fill_value=0)
+    
+    # Column totals
+    sales_totals = wide[SALES_COLUMNS].sum()
+    
+    # Both spending cut-offs from one quantile call (NaN-skipping, like pandas)
+    total_sales = wide['Total_sales'].to_numpy()
+    if total_sales.size:
+        q80, q90 = np.nanquantile(total_sales, [0.8, 0.9])
+        premium_customers = int((total_sales > q80).sum())
+        high_spenders = int((total_sales > q90).sum())
+    else:
+        premium_customers = high_spenders = 0
+    
+    # Spending tiers: bins are right-inclusive, as with pd.cut, so
+    # searchsorted on the upper edges gives the tier and bincount the sizes
+    tier_labels = ['Low (0-2K)', 'Medium (2K-5K)', 'High (5K-10K)',
+                   'Premium (10K-20K)', 'VIP (20K+)']
+    tier_idx = np.searchsorted([2000, 5000, 10000, 20000], total_sales[total_sales > 0])
+    tier_counts = pd.Series(np.bincount(tier_idx, minlength=len(tier_labels)), index=tier_labels)
+    
+    # Fixed-seed sample for the scatter plot, so reruns reuse the same points;
+    # each segment gets a proportional quota (at least one point) so small
+    # segments keep their colour
+    if len(_df) > SCATTER_SAMPLE_SIZE:
+        rng = np.random.default_rng(0)
+        segment_codes = _df['cluster_catgeory'].cat.codes.to_numpy()
+        rows = [np.empty(0, dtype=np.intp)]
+        for code, size in enumerate(np.bincount(segment_codes[segment_codes >= 0])):
+            if size == 0:
+                continue
+            members = np.flatnonzero(segment_codes == code)
+            quota = min(size, max(1, round(SCATTER_SAMPLE_SIZE * size / len(_df))))
+            rows.append(rng.choice(members, quota, replace=False))
+        scatter_sample = _df.take(np.sort(np.concatenate(rows)))[SCATTER_COLUMNS]
+    else:
+        scatter_sample = _df[SCATTER_COLUMNS]
+    
+    return {
+        'city_stats': city_stats,
+        'segment_stats': segment_stats,
+        'city_segment_revenue': city_segment_revenue,
+        'sales_totals': sales_totals,
+        'record_count': len(_df),
+        'customer_count': count_unique(_df['Customer_ID']),
+        'city_count': count_unique(_df['outlet_city']),
+        'premium_customers': premium_customers,
+        'high_spenders': high_spenders,
+        'tier_counts': tier_counts,
+        'scatter_sample': scatter_sample
+    }
+
+def render_chart(fig, config=None):
+    """Render a Plotly figure inside a styled chart container"""
+    st.markdown('<div class="chart-container">', unsafe_allow_html=True)
+    st.plotly_chart(fig, use_container_width=True, config=config)
+    st.markdown('</div>', unsafe_allow_html=True)
+
+def count_unique(values):
+    """Count the distinct non-missing values in a column"""
+    # Categoricals and densely numbered integer IDs are counted with a
+    # bincount over codes/offsets; anything else falls back to hashing
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        codes = values.cat.codes.to_numpy()
+        return int(np.count_nonzero(np.bincount(codes[codes >= 0])))
+    if isinstance(values.dtype, np.dtype) and values.dtype.kind in 'iu' and len(values):
+        ids = values.to_numpy()
+        low, high = int(ids.min()), int(ids.max())
+        if high - low <= 4 * len(ids):
+            # Offsets in int64: narrow ID types (int8/int16) would overflow
+            return int(np.count_nonzero(np.bincount(ids.astype(np.int64, copy=False) - low)))
+    return values.nunique()
+
+def build_filter_mask(df, selected_cities, selected_segments, sales_range):
+    """Build the sidebar filter as one boolean mask over categorical codes"""
+    # Per-category lookup tables; the trailing False slot catches code -1 (missing)
+    city_ok = np.append(df['outlet_city'].cat.categories.isin(selected_cities), False)
+    segment_ok = np.append(df['cluster_catgeory'].cat.categories.isin(selected_segments), False)
+    
+    # Fuse the four conditions in place instead of allocating a mask per test
+    mask = city_ok[df['outlet_city'].cat.codes.to_numpy()]
+    mask &= segment_ok[df['cluster_catgeory'].cat.codes.to_numpy()]
+    sales = df['Total_sales'].to_numpy()
+    mask &= sales >= sales_range[0]
+    mask &= sales <= sales_range[1]
+    return mask
+
 # Main Dashboard
 def main():
-    # Load data
-    df = pd.read_csv("GrowEasyAnalytics_1.csv")
+    # Load data (parsed once, served from cache on every rerun)
+    df = load_data()
     
     # Header
     st.markdown('<h1 class="main-header">Sri Lanka Supermarket Chain Analytics</h1>', unsafe_allow_html=True)
@@ -124,25 +412,25 @@ def main():
     # Sidebar controls
     st.sidebar.header("Dashboard Controls")
     
-    # City filter
-    all_cities = ['All Cities'] + sorted(df['outlet_city'].unique().tolist())
+    # City filter (categories are precomputed, sorted and free to read)
+    city_options = df['outlet_city'].cat.categories.tolist()
     selected_cities = st.sidebar.multiselect(
         "Select Cities:",
-        options=df['outlet_city'].unique(),
-        default=df['outlet_city'].unique()
+        options=city_options,
+        default=city_options
     )
     
     # Customer segment filter
-    all_segments = ['All Segments'] + sorted(df['cluster_catgeory'].unique().tolist())
+    segment_options = df['cluster_catgeory'].cat.categories.tolist()
     selected_segments = st.sidebar.multiselect(
         "Select Customer Segments:",
-        options=df['cluster_catgeory'].unique(),
-        default=df['cluster_catgeory'].unique()
+        options=segment_options,
+        default=segment_options
     )
     
-    # Sales range filter
-    min_sales = int(df['Total_sales'].min())
-    max_sales = int(df['Total_sales'].max())
+    # Sales range filter (rounded outwards so the full range keeps every row)
+    min_sales = int(np.floor(df['Total_sales'].min()))
+    max_sales = int(np.ceil(df['Total_sales'].max()))
     sales_range = st.sidebar.slider(
         "Total Sales Range (LKR):",
         min_value=min_sales,
@@ -152,29 +440,52 @@ def main():
         format="LKR %d"
     )
     
-    # Apply filters
-    filtered_df = df[
-        (df['outlet_city'].isin(selected_cities)) &
-        (df['cluster_catgeory'].isin(selected_segments)) &
-        (df['Total_sales'] >= sales_range[0]) &
-        (df['Total_sales'] <= sales_range[1])
-    ]
+    # Apply filters; the default all-inclusive selection is served as-is
+    # instead of scanning and copying every row. The mask also drops rows
+    # with a missing city, segment or total, so the shortcut only applies
+    # when there are none
+    unrestricted = (
+        len(selected_cities) == len(city_options) and
+        len(selected_segments) == len(segment_options) and
+        tuple(sales_range) == (min_sales, max_sales) and
+        not any(df[col].hasnans for col in ('outlet_city', 'cluster_catgeory', 'Total_sales'))
+    )
+    if unrestricted:
+        filtered_df = df
+    else:
+        filtered_df = df[build_filter_mask(df, selected_cities, selected_segments, sales_range)]
     
     # Dataset info
     st.sidebar.info(f"""
     **Dataset Overview**
     - **Records:** {len(filtered_df):,} of {len(df):,}
-    - **Cities:** {filtered_df['outlet_city'].nunique()}
-    - **Customers:** {filtered_df['Customer_ID'].nunique():,}
-    - **Segments:** {filtered_df['cluster_catgeory'].nunique()}
+    - **Cities:** {count_unique(filtered_df['outlet_city'])}
+    - **Customers:** {count_unique(filtered_df['Customer_ID']):,}
+    - **Segments:** {count_unique(filtered_df['cluster_catgeory'])}
     """)
     
+    # Nothing to aggregate or chart when the filters exclude every row
+    if filtered_df.empty:
+        st.warning("No records match the selected filters. Adjust the sidebar controls to see the analytics.")
+        return
+    
+    # Grouped totals computed once and shared by the metrics and charts; the
+    # cache is keyed on the dataset fingerprint and the filter state, so the
+    # filtered frame itself (_df) is never hashed
+    filter_key = (tuple(sorted(selected_cities)), tuple(sorted(selected_segments)),
+                  tuple(sales_range))
+    aggregates = compute_aggregates(filtered_df, df.attrs['fingerprint'], filter_key)
+    city_stats = aggregates['city_stats']
+    segment_stats = aggregates['segment_stats']
+    
     # Hero metrics
-    create_hero_metrics(filtered_df)
+    create_hero_metrics(aggregates)
     
     # Customer insights
     st.header("Key Business Insights")
-    insights = create_customer_insights_box(filtered_df)
+    insights = create_customer_insights_box(
+        aggregates['city_stats'], aggregates['segment_stats'], aggregates['sales_totals'],
+        aggregates['high_spenders'], aggregates['customer_count'])
     
     col_insight1, col_insight2 = st.columns(2)
     with col_insight1:
@@ -192,121 +503,112 @@ def main():
     col1, col2, col3 = st.columns(3)
     
     with col1:
-        st.markdown('<div class="chart-container">', unsafe_allow_html=True)
-        fig_category = create_category_donut_chart(filtered_df)
-        st.plotly_chart(fig_category, use_container_width=True)
-        st.markdown('</div>', unsafe_allow_html=True)
+        render_chart(create_category_donut_chart(aggregates['sales_totals']))
     
     with col2:
-        st.markdown('<div class="chart-container">', unsafe_allow_html=True)
-        fig_city = create_city_revenue_donut(filtered_df)
-        st.plotly_chart(fig_city, use_container_width=True)
-        st.markdown('</div>', unsafe_allow_html=True)
+        render_chart(create_city_revenue_donut(city_stats))
     
     with col3:
-        st.markdown('<div class="chart-container">', unsafe_allow_html=True)
-        fig_cluster = create_cluster_donut_chart(filtered_df)
-        st.plotly_chart(fig_cluster, use_container_width=True)
-        st.markdown('</div>', unsafe_allow_html=True)
+        render_chart(create_cluster_donut_chart(segment_stats))
     
     # Second row - Category-specific donut charts
     st.subheader("Category-Specific Performance")
     col4, col5, col6 = st.columns(3)
     
     with col4:
-        st.markdown('<div class="chart-container">', unsafe_allow_html=True)
-        fig_luxury = create_top_cities_luxury_donut(filtered_df)
-        st.plotly_chart(fig_luxury, use_container_width=True)
-        st.markdown('</div>', unsafe_allow_html=True)
+        render_chart(create_top_cities_luxury_donut(city_stats))
     
     with col5:
-        st.markdown('<div class="chart-container">', unsafe_allow_html=True)
-        fig_fresh = create_fresh_sales_donut(filtered_df)
-        st.plotly_chart(fig_fresh, use_container_width=True)
-        st.markdown('</div>', unsafe_allow_html=True)
+        render_chart(create_fresh_sales_donut(city_stats))
     
     with col6:
-        st.markdown('<div class="chart-container">', unsafe_allow_html=True)
-        fig_tiers = create_customer_spending_tiers_donut(filtered_df)
-        st.plotly_chart(fig_tiers, use_container_width=True)
-        st.markdown('</div>', unsafe_allow_html=True)
+        render_chart(create_customer_spending_tiers_donut(aggregates['tier_counts']))
     
     # Third row - Additional donut chart and bar chart
     st.subheader("Advanced Analytics")
     col7, col8 = st.columns(2)
     
     with col7:
-        st.markdown('<div class="chart-container">', unsafe_allow_html=True)
-        fig_cluster_breakdown = create_cluster_category_breakdown_donut(filtered_df)
-        st.plotly_chart(fig_cluster_breakdown, use_container_width=True)
-        st.markdown('</div>', unsafe_allow_html=True)
+        render_chart(create_cluster_category_breakdown_donut(segment_stats))
     
     with col8:
-        st.markdown('<div class="chart-container">', unsafe_allow_html=True)
-        fig_racing = create_city_performance_racing_bar(filtered_df)
-        st.plotly_chart(fig_racing, use_container_width=True)
-        st.markdown('</div>', unsafe_allow_html=True)
+        render_chart(create_city_performance_racing_bar(city_stats))
     
     # Fourth row - Scatter plot and heatmap
     st.subheader("Customer Behavior Analysis")
     col9, col10 = st.columns(2)
     
     with col9:
-        st.markdown('<div class="chart-container">', unsafe_allow_html=True)
-        fig_scatter = create_customer_segment_analysis(filtered_df)
-        st.plotly_chart(fig_scatter, use_container_width=True)
-        st.markdown('</div>', unsafe_allow_html=True)
+        render_chart(create_customer_segment_analysis(aggregates['scatter_sample']))
     
     with col10:
-        st.markdown('<div class="chart-container">', unsafe_allow_html=True)
-        fig_heatmap = create_sales_trends_heatmap(filtered_df)
-        st.plotly_chart(fig_heatmap, use_container_width=True)
-        st.markdown('</div>', unsafe_allow_html=True)
+        # Every cell is labelled, so the heatmap is drawn as a static image
+        render_chart(create_sales_trends_heatmap(aggregates['city_segment_revenue']),
+                     config={'staticPlot': True, 'displayModeBar': False})
     
     # Performance metrics table
     st.header("Detailed Performance Metrics")
     st.markdown('<div class="chart-container">', unsafe_allow_html=True)
-    metrics_table = create_performance_metrics_table(filtered_df)
-    st.dataframe(metrics_table, use_container_width=True)
+    metrics_table = create_performance_metrics_table(city_stats)
+    # Currency columns stay numeric (sortable, unformatted in the CSV
+    # download) and are formatted in the browser
+    currency_cols = ['Total Revenue', 'Avg Basket Value', 'Luxury Revenue', 
+                    'Avg Luxury Spend', 'Fresh Revenue', 'Avg Fresh Spend', 
+                    'Dry Revenue', 'Avg Dry Spend']
+    currency_format = st.column_config.NumberColumn(format="LKR %,.0f")
+    st.dataframe(metrics_table, use_container_width=True,
+                 column_config=dict.fromkeys(currency_cols, currency_format))
     st.markdown('</div>', unsafe_allow_html=True)
     
     # Data explorer
     with st.expander("Raw Data Explorer"):
         st.subheader("Filtered Dataset")
-        st.dataframe(filtered_df, use_container_width=True)
+        # A RangeIndex is stored as Arrow metadata instead of a column; only
+        # a filtered frame's index needs resetting (which copies it)
+        explorer_df = filtered_df
+        if not isinstance(explorer_df.index, pd.RangeIndex):
+            explorer_df = explorer_df.reset_index(drop=True)
+        st.dataframe(explorer_df, use_container_width=True, hide_index=True)
         
-        # Download options
+        # Download options (the file contents are generated only on click,
+        # and clicking does not rerun the dashboard)
         col_d1, col_d2, col_d3 = st.columns(3)
         
         with col_d1:
-            csv = filtered_df.to_csv(index=False)
+            # Parquet keeps the column types and is far smaller than CSV
+            st.download_button(
+                label="Download Parquet",
+                data=lambda: filtered_df.to_parquet(index=False, compression="zstd"),
+                file_name=f"supermarket_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.parquet",
+                mime="application/vnd.apache.parquet",
+                on_click="ignore"
+            )
             st.download_button(
                 label="Download CSV",
-                data=csv,
+                data=lambda: filtered_df.to_csv(index=False),
                 file_name=f"supermarket_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                mime="text/csv"
+                mime="text/csv",
+                on_click="ignore"
             )
         
         with col_d2:
             # Summary statistics
-            summary_stats = filtered_df.describe()
-            summary_csv = summary_stats.to_csv()
             st.download_button(
                 label="Download Summary Stats",
-                data=summary_csv,
+                data=lambda: filtered_df.describe().to_csv(),
                 file_name=f"summary_stats_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                mime="text/csv"
+                mime="text/csv",
+                on_click="ignore"
             )
         
         with col_d3:
-            # City-wise summary
-            city_summary = create_performance_metrics_table(filtered_df)
-            city_csv = city_summary.to_csv(index=False)
+            # City-wise summary (the table rendered above)
             st.download_button(
                 label="Download City Summary",
-                data=city_csv,
+                data=lambda: metrics_table.to_csv(index=False),
                 file_name=f"city_summary_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                mime="text/csv"
+                mime="text/csv",
+                on_click="ignore"
             )
     
     # Footer
@@ -317,7 +619,7 @@ def main():
                     border-radius: 15px; color: white; margin-top: 30px;'>
             <h3 style='margin: 0; font-weight: 300;'>Sri Lanka Supermarket Chain Analytics Dashboard</h3>
             <p style='margin: 10px 0 0 0; opacity: 0.8;'>
-                Empowering data-driven decisions across {len(df['outlet_city'].unique())} cities • 
+                Empowering data-driven decisions across {count_unique(df['outlet_city'])} cities • 
                 {len(df):,} transactions analyzed • Built with Streamlit & Plotly
             </p>
         </div>
@@ -325,12 +627,14 @@ def main():
         unsafe_allow_html=True
     )
     
-def create_hero_metrics(df):
+def create_hero_metrics(aggregates):
     """Create stunning hero metrics for supermarket chain"""
-    total_revenue = df['Total_sales'].sum()
-    total_customers = df['Customer_ID'].nunique()
-    total_outlets = df['outlet_city'].nunique()
-    avg_basket_value = df['Total_sales'].mean()
+    city_stats = aggregates['city_stats']
+    sales_totals = aggregates['sales_totals']
+    total_revenue = sales_totals['Total_sales']
+    total_customers = aggregates['customer_count']
+    total_outlets = aggregates['city_count']
+    avg_basket_value = total_revenue / aggregates['record_count']
     
     # Hero Revenue Display
     st.markdown(f"""
@@ -347,7 +651,7 @@ def create_hero_metrics(df):
     col1, col2, col3, col4, col5 = st.columns(5)
     
     with col1:
-        luxury_revenue = df['luxury_sales'].sum()
+        luxury_revenue = sales_totals['luxury_sales']
         luxury_share = (luxury_revenue / total_revenue) * 100
         st.metric(
             label="Luxury Sales",
@@ -357,7 +661,7 @@ def create_hero_metrics(df):
         )
     
     with col2:
-        fresh_revenue = df['fresh_sales'].sum()
+        fresh_revenue = sales_totals['fresh_sales']
         fresh_share = (fresh_revenue / total_revenue) * 100
         st.metric(
             label="Fresh Sales",
@@ -367,7 +671,7 @@ def create_hero_metrics(df):
         )
     
     with col3:
-        dry_revenue = df['dry_sales'].sum()
+        dry_revenue = sales_totals['dry_sales']
         dry_share = (dry_revenue / total_revenue) * 100
         st.metric(
             label="Dry Goods Sales",
@@ -377,8 +681,8 @@ def create_hero_metrics(df):
         )
     
     with col4:
-        top_city = df.groupby('outlet_city')['Total_sales'].sum().idxmax()
-        top_city_revenue = df.groupby('outlet_city')['Total_sales'].sum().max()
+        top_city = city_stats['Total_sales'].idxmax()
+        top_city_revenue = city_stats['Total_sales'].max()
         st.metric(
             label="Top Performing City",
             value=top_city,
@@ -387,7 +691,7 @@ def create_hero_metrics(df):
         )
     
     with col5:
-        high_value_customers = len(df[df['Total_sales'] > df['Total_sales'].quantile(0.8)])
+        high_value_customers = aggregates['premium_customers']
         st.metric(
             label="Premium Customers",
             value=f"{high_value_customers:,}",
@@ -395,12 +699,13 @@ def create_hero_metrics(df):
             help="Top 20% customers by spending"
         )
 
-def create_category_donut_chart(df):
+@st.cache_resource(max_entries=32)
+def create_category_donut_chart(sales_totals):
     """Create main category distribution donut chart"""
     categories = {
-        'Luxury Sales': df['luxury_sales'].sum(),
-        'Fresh Sales': df['fresh_sales'].sum(),
-        'Dry Goods Sales': df['dry_sales'].sum()
+        'Luxury Sales': sales_totals['luxury_sales'],
+        'Fresh Sales': sales_totals['fresh_sales'],
+        'Dry Goods Sales': sales_totals['dry_sales']
     }
     
     fig = go.Figure(data=[go.Pie(
@@ -447,9 +752,10 @@ def create_category_donut_chart(df):
     
     return fig
 
-def create_city_revenue_donut(df):
+@st.cache_resource(max_entries=32)
+def create_city_revenue_donut(city_stats):
     """Create city-wise revenue donut chart"""
-    city_revenue = df.groupby('outlet_city')['Total_sales'].sum().sort_values(ascending=False)
+    city_revenue = city_stats['Total_sales'].sort_values(ascending=False)
     
     # Take top 10 cities and group others
     if len(city_revenue) > 10:
@@ -462,7 +768,7 @@ def create_city_revenue_donut(df):
         city_data = city_revenue
     
     fig = go.Figure(data=[go.Pie(
-        labels=city_data.index,
+        labels=city_data.index.to_numpy(),
         values=city_data.values,
         hole=0.5,
         marker=dict(
@@ -504,12 +810,13 @@ def create_city_revenue_donut(df):
     
     return fig
 
-def create_cluster_donut_chart(df):
+@st.cache_resource(max_entries=32)
+def create_cluster_donut_chart(segment_stats):
     """Create customer cluster distribution donut chart"""
-    cluster_data = df.groupby('cluster_catgeory')['Total_sales'].sum()
+    cluster_data = segment_stats['Total_sales']
     
     fig = go.Figure(data=[go.Pie(
-        labels=cluster_data.index,
+        labels=cluster_data.index.to_numpy(),
         values=cluster_data.values,
         hole=0.6,
         marker=dict(
@@ -552,12 +859,13 @@ def create_cluster_donut_chart(df):
     
     return fig
 
-def create_top_cities_luxury_donut(df):
+@st.cache_resource(max_entries=32)
+def create_top_cities_luxury_donut(city_stats):
     """Create luxury sales distribution donut for top cities"""
-    city_luxury = df.groupby('outlet_city')['luxury_sales'].sum().sort_values(ascending=False).head(8)
+    city_luxury = city_stats['luxury_sales'].sort_values(ascending=False).head(8)
     
     fig = go.Figure(data=[go.Pie(
-        labels=city_luxury.index,
+        labels=city_luxury.index.to_numpy(),
         values=city_luxury.values,
         hole=0.55,
         marker=dict(
@@ -599,12 +907,13 @@ def create_top_cities_luxury_donut(df):
     
     return fig
 
-def create_fresh_sales_donut(df):
+@st.cache_resource(max_entries=32)
+def create_fresh_sales_donut(city_stats):
     """Create fresh sales distribution donut for top cities"""
-    city_fresh = df.groupby('outlet_city')['fresh_sales'].sum().sort_values(ascending=False).head(8)
+    city_fresh = city_stats['fresh_sales'].sort_values(ascending=False).head(8)
     
     fig = go.Figure(data=[go.Pie(
-        labels=city_fresh.index,
+        labels=city_fresh.index.to_numpy(),
         values=city_fresh.values,
         hole=0.55,
         marker=dict(
@@ -646,20 +955,15 @@ def create_fresh_sales_donut(df):
     
     return fig
 
-def create_customer_spending_tiers_donut(df):
+@st.cache_resource(max_entries=32)
+def create_customer_spending_tiers_donut(tier_counts):
     """Create customer spending tiers donut chart"""
-    # Create spending tiers
-    df_copy = df.copy()
-    spending_ranges = pd.cut(df_copy['Total_sales'], 
-                           bins=[0, 2000, 5000, 10000, 20000, float('inf')],
-                           labels=['Low (0-2K)', 'Medium (2K-5K)', 'High (5K-10K)', 
-                                  'Premium (10K-20K)', 'VIP (20K+)'])
-    
-    tier_counts = spending_ranges.value_counts()
+    # Largest tier first, so slice colours follow the customer counts
+    tier_counts = tier_counts.sort_values(ascending=False, kind='stable')
     
     fig = go.Figure(data=[go.Pie(
-        labels=tier_counts.index,
-        values=tier_counts.values,
+        labels=tier_counts.index.to_numpy(),
+        values=tier_counts.to_numpy(),
         hole=0.6,
         marker=dict(
             colors=['#FFE4E1', '#FFB6C1', '#FFA07A', '#FF7F50', '#FF6347'],
@@ -700,19 +1004,14 @@ def create_customer_spending_tiers_donut(df):
     
     return fig
 
-def create_cluster_category_breakdown_donut(df):
+@st.cache_resource(max_entries=32)
+def create_cluster_category_breakdown_donut(segment_stats):
     """Create detailed cluster category breakdown donut"""
-    cluster_stats = df.groupby('cluster_catgeory').agg({
-        'Customer_ID': 'nunique',
-        'Total_sales': 'sum'
-    })
-    
     # Calculate average spending per customer for each cluster
-    cluster_stats['avg_spending'] = cluster_stats['Total_sales'] / cluster_stats['Customer_ID']
-    cluster_avg_spending = cluster_stats['avg_spending']
+    cluster_avg_spending = segment_stats['Total_sales'] / segment_stats['Customer_ID']
     
     fig = go.Figure(data=[go.Pie(
-        labels=cluster_avg_spending.index,
+        labels=cluster_avg_spending.index.to_numpy(),
         values=cluster_avg_spending.values,
         hole=0.5,
         marker=dict(
@@ -754,31 +1053,25 @@ def create_cluster_category_breakdown_donut(df):
     
     return fig
 
-def create_city_performance_racing_bar(df):
+@st.cache_resource(max_entries=32)
+def create_city_performance_racing_bar(city_stats):
     """Create interactive racing bar chart for city performance"""
-    city_stats = df.groupby('outlet_city').agg({
-        'Total_sales': 'sum',
-        'Customer_ID': 'nunique',
-        'luxury_sales': 'sum',
-        'fresh_sales': 'sum',
-        'dry_sales': 'sum'
-    }).reset_index()
-    
-    city_stats = city_stats.sort_values('Total_sales', ascending=True)
+    city_stats = city_stats.reset_index().sort_values('Total_sales', ascending=True)
+    revenue = city_stats['Total_sales'].to_numpy()
     
     fig = go.Figure()
     
     fig.add_trace(go.Bar(
-        y=city_stats['outlet_city'],
-        x=city_stats['Total_sales'],
+        y=city_stats['outlet_city'].to_numpy(),
+        x=revenue,
         orientation='h',
         marker=dict(
-            color=city_stats['Total_sales'],
+            color=revenue,
             colorscale='Viridis',
             showscale=True,
             colorbar=dict(title="Revenue (LKR)", x=1.02)
         ),
-        text=[f'LKR {x:,.0f}' for x in city_stats['Total_sales']],
+        text=[f'LKR {x:,.0f}' for x in revenue.tolist()],
         textposition='auto',
         hovertemplate='<b>%{y}</b><br>' +
                      'Total Revenue: LKR %{x:,.0f}<br>' +
@@ -786,7 +1079,7 @@ def create_city_performance_racing_bar(df):
                      'Luxury Sales: LKR %{customdata[1]:,.0f}<br>' +
                      'Fresh Sales: LKR %{customdata[2]:,.0f}<br>' +
                      'Dry Sales: LKR %{customdata[3]:,.0f}<extra></extra>',
-        customdata=city_stats[['Customer_ID', 'luxury_sales', 'fresh_sales', 'dry_sales']].values
+        customdata=city_stats[['Customer_ID', 'luxury_sales', 'fresh_sales', 'dry_sales']].to_numpy()
     ))
     
     fig.update_layout(
@@ -800,10 +1093,10 @@ def create_city_performance_racing_bar(df):
     
     return fig
 
-def create_customer_segment_analysis(df):
+def create_customer_segment_analysis(scatter_sample):
     """Create customer segmentation scatter plot"""
     fig = px.scatter(
-        df.sample(10000) if len(df) > 10000 else df,  # Sample for performance
+        scatter_sample,
         x='luxury_sales',
         y='fresh_sales',
         size='Total_sales',
@@ -835,23 +1128,15 @@ def create_customer_segment_analysis(df):
     
     return fig
 
-def create_sales_trends_heatmap(df):
+@st.cache_resource(max_entries=32)
+def create_sales_trends_heatmap(pivot_revenue):
     """Create advanced heatmap for sales analysis"""
-    heatmap_data = df.groupby(['outlet_city', 'cluster_catgeory']).agg({
-        'Total_sales': 'sum',
-        'Customer_ID': 'nunique'
-    }).reset_index()
-    
-    pivot_revenue = heatmap_data.pivot(index='outlet_city', columns='cluster_catgeory', values='Total_sales')
-    pivot_revenue = pivot_revenue.fillna(0)
-    
     fig = go.Figure(data=go.Heatmap(
-        z=pivot_revenue.values,
-        x=pivot_revenue.columns,
-        y=pivot_revenue.index,
+        z=pivot_revenue.to_numpy(),
+        x=pivot_revenue.columns.to_numpy(),
+        y=pivot_revenue.index.to_numpy(),
         colorscale='Viridis',
-        text=np.round(pivot_revenue.values, 0),
-        texttemplate="%{text:,.0f}",
+        texttemplate="%{z:,.0f}",
         textfont={"size": 10},
         hovertemplate='<b>%{y} - %{x}</b><br>Revenue: LKR %{z:,.0f}<extra></extra>'
     ))
@@ -866,19 +1151,13 @@ def create_sales_trends_heatmap(df):
     
     return fig
 
-def create_performance_metrics_table(df):
+def create_performance_metrics_table(city_stats):
     """Create comprehensive performance metrics table"""
-    city_metrics = df.groupby('outlet_city').agg({
-        'Total_sales': ['sum', 'mean', 'count'],
-        'Customer_ID': 'nunique',
-        'luxury_sales': ['sum', 'mean'],
-        'fresh_sales': ['sum', 'mean'],
-        'dry_sales': ['sum', 'mean']
-    }).round(2)
-    
-    # Flatten column names
-    city_metrics.columns = ['_'.join(col).strip() for col in city_metrics.columns]
-    city_metrics = city_metrics.reset_index()
+    city_metrics = city_stats[[
+        'Total_sales', 'avg_basket', 'transactions', 'Customer_ID',
+        'luxury_sales', 'avg_luxury', 'fresh_sales', 'avg_fresh',
+        'dry_sales', 'avg_dry'
+    ]].round(2).reset_index()
     
     # Rename columns for better display
     city_metrics.columns = [
@@ -887,90 +1166,7 @@ def create_performance_metrics_table(df):
         'Fresh Revenue', 'Avg Fresh Spend', 'Dry Revenue', 'Avg Dry Spend'
     ]
     
-    # Format currency columns
-    currency_cols = ['Total Revenue', 'Avg Basket Value', 'Luxury Revenue', 
-                    'Avg Luxury Spend', 'Fresh Revenue', 'Avg Fresh Spend', 
-                    'Dry Revenue', 'Avg Dry Spend']
-    
-    for col in currency_cols:
-        city_metrics[col] = city_metrics[col].apply(lambda x: f"LKR {x:,.0f}")
-    
     return city_metrics.sort_values('City')
 
 if __name__ == "__main__":
     main()
-def load_data():
-    """Load and cache the supermarket dataset"""
-    try:
-        df = pd.read_csv(DATASET_FILENAME)
-        
-        # Check if the required columns exist and fix column names if needed
-        expected_columns = ['Customer_ID', 'outlet_city', 'luxury_sales', 'fresh_sales', 
-                          'dry_sales', 'cluster_name', 'Total_sales']
-        
-        # Handle the cluster_category vs cluster_catgeory naming issue
-        if 'cluster_category' in df.columns and 'cluster_catgeory' not in df.columns:
-            df = df.rename(columns={'cluster_category': 'cluster_catgeory'})
-        elif 'cluster_catgeory' not in df.columns and 'cluster_category' not in df.columns:
-            st.error("Column 'cluster_catgeory' or 'cluster_category' not found in dataset!")
-            st.error(f"Available columns: {list(df.columns)}")
-            st.stop()
-        
-        # Verify all required columns exist
-        missing_columns = []
-        for col in expected_columns:
-            if col not in df.columns:
-                missing_columns.append(col)
-        
-        if 'cluster_catgeory' not in df.columns:
-            missing_columns.append('cluster_catgeory')
-            
-        if missing_columns:
-            st.error(f"Missing required columns: {missing_columns}")
-            st.error(f"Available columns in your dataset: {list(df.columns)}")
-            st.stop()
-            
-        return df
-        
-    except FileNotFoundError:
-        st.error(f"Dataset file '{DATASET_FILENAME}' not found!")
-        st.info("Please ensure your CSV file is:")
-        st.info("1. Located in the same directory as this script")
-        st.info("2. Named correctly in the DATASET_FILENAME variable")
-        st.info("3. Uploaded to your deployment platform if using cloud hosting")
-        
-        # Provide file upload option as fallback
-        st.subheader("Upload your dataset instead:")
-        uploaded_file = st.file_uploader("Choose your CSV file", type="csv")
-        if uploaded_file is not None:
-            try:
-                df = pd.read_csv(uploaded_file)
-                # Apply the same column checks as above
-                if 'cluster_category' in df.columns and 'cluster_catgeory' not in df.columns:
-                    df = df.rename(columns={'cluster_category': 'cluster_catgeory'})
-                return df
-            except Exception as e:
-                st.error(f"Error reading uploaded file: {str(e)}")
-                st.stop()
-        else:
-            st.stop()
-            
-    except Exception as e:
-        st.error(f"Error loading dataset: {str(e)}")
-        st.error("Please check your dataset format and column names")
-        
-        # Show file upload option as fallback
-        st.subheader("Try uploading your dataset:")
-        uploaded_file = st.file_uploader("Choose your CSV file", type="csv")
-        if uploaded_file is not None:
-            try:
-                df = pd.read_csv(uploaded_file)
-                if 'cluster_category' in df.columns and 'cluster_catgeory' not in df.columns:
-                    df = df.rename(columns={'cluster_category': 'cluster_catgeory'})
-                return df
-            except Exception as e:
-                st.error(f"Error reading uploaded file: {str(e)}")
-                st.stop()
-        else:
-            st.stop()
-